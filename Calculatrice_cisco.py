@@ -1,42 +1,190 @@
-import ipaddress, csv, json, sys
-from rich.console import Console
-from rich.table import Table
-from rich.prompt import IntPrompt, Prompt
+import argparse, ipaddress, csv, json, re, sys
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 
-console = Console()
+# Rich n'est importé qu'à la première interaction (invites, tableau stylé) :
+# les exécutions non interactives n'en paient pas le coût au démarrage.
+# Seules les balises de style employées par le script sont retirées en mode texte.
+_MARKUP = re.compile(r"\[/?(?:red|green|bold cyan)\]")
+
+
+class _PlainConsole:
+    """Console texte utilisée tant que Rich n'est pas chargé (balises retirées)."""
+
+    @property
+    def file(self):
+        return sys.stdout
+
+    def print(self, *objects):
+        print(*(_MARKUP.sub("", str(o)) for o in objects))
+
+
+console = _PlainConsole()
+
+
+def _use_rich():
+    """Charge Rich et remplace la console texte par une console Rich."""
+    global console
+    if isinstance(console, _PlainConsole):
+        from rich.console import Console
+        console = Console()
+
+
+def _ask_int(prompt, default):
+    """Lit un entier sur une ligne ; une ligne vide renvoie `default`."""
+    while True:
+        answer = input(f"{prompt} ({default}): ").strip()
+        if not answer:
+            return default
+        try:
+            return int(answer)
+        except ValueError:
+            console.print("[red]Veuillez entrer un nombre entier.[/red]")
+
+
+def _fmt_ip(x):
+    """Notation décimale pointée d'une adresse IPv4 donnée sous forme d'entier."""
+    return f"{(x >> 24) & 0xFF}.{(x >> 16) & 0xFF}.{(x >> 8) & 0xFF}.{x & 0xFF}"
+
+
+# Tables précalculées par longueur de préfixe (/0 à /32)
+NETMASKS = tuple(_fmt_ip((0xFFFFFFFF << (32 - p)) & 0xFFFFFFFF) for p in range(33))
+BROADCAST_OFFSET = tuple((1 << (32 - p)) - 1 for p in range(33))
+
+# Colonnes d'une allocation, dans l'ordre d'export
+FIELDS = ("type", "desc", "network", "mask", "range", "broadcast")
+HEADERS = ("Type", "Description", "Réseau", "Masque", "Plage utilisable", "Broadcast")
+
+
+@dataclass(slots=True, frozen=True)
+class Allocation:
+    type: str
+    desc: str
+    network: str
+    mask: str
+    range: str
+    broadcast: str
+
+
+# Nombre de lignes au-delà duquel le tableau est affiché sans Rich
+PLAIN_TABLE_THRESHOLD = 200
+
+
+@lru_cache(maxsize=None)
+def _prefix_for(hosts):
+    """Préfixe d'un LAN de `hosts` utilisateurs (+ réseau et broadcast), au minimum /24."""
+    return max(32 - (hosts + 1).bit_length(), 24)
+
+
+def _allocate(base, end, prefixes):
+    """Place chaque préfixe (dans l'ordre) dans [base, end[.
+
+    Retourne (adresses réseau, curseur final) ; -1 marque un sous-réseau qui
+    ne rentre pas. La liste est tronquée dès que l'espace est épuisé.
+    """
+    starts = []
+    for prefix in prefixes:
+        size = 1 << (32 - prefix)
+        start = (base + size - 1) & ~(size - 1)
+        if start + size > end:
+            starts.append(-1)
+            continue
+        starts.append(start)
+        base = start + size
+        if base >= end:
+            break
+    return starts, base
+
+
+def _desc(kind, names):
+    """Libellé d'un sous-réseau : "R1-LAN1" ou "R1->R2" pour un lien P2P."""
+    return f"{names[0]}->{names[1]}" if kind == "P2P" else f"{names[0]}-{names[1]}"
+
+
+def _allocation(kind, names, start, prefix):
+    """Allocation formatée d'un sous-réseau placé à l'adresse entière `start`."""
+    broadcast = start + BROADCAST_OFFSET[prefix]
+    return Allocation(
+        type=kind,
+        desc=_desc(kind, names),
+        network=f"{_fmt_ip(start)}/{prefix}",
+        mask=NETMASKS[prefix],
+        range=f"{_fmt_ip(start + 1)} - {_fmt_ip(broadcast - 1)}",
+        broadcast=_fmt_ip(broadcast)
+    )
 
 class NetworkPlanner:
-    def __init__(self):
+    def __init__(self, config_path=None, plain=False):
         self.network = None
         self.routers = []
+        self.config_path = config_path
+        # Mode texte : ni Rich ni extension C, le script tourne tel quel sous PyPy
+        self.plain = plain
+
+    def _prompt(self, prompt, default=None, choices=None):
+        if not self.plain:
+            _use_rich()
+            from rich.prompt import Prompt
+            kwargs = {} if default is None else {"default": default}
+            return Prompt.ask(prompt, choices=choices, **kwargs)
+        hint = f" [{'/'.join(choices)}]" if choices else ""
+        hint += f" ({default})" if default is not None else ""
+        while True:
+            answer = input(f"{prompt}{hint}: ").strip() or default
+            if answer and (choices is None or answer in choices):
+                return answer
+            console.print("Veuillez choisir une option valide.")
+
+    def load_config(self):
+        """Charge le réseau et les routeurs depuis un fichier JSON, sans aucune invite.
+
+        Format : {"network": "192.168.0.0/16",
+                  "routers": [{"name": "R1", "interfaces": 2,
+                               "subnets": [{"name": "LAN1", "hosts": 10}]}]}
+        """
+        try:
+            with open(self.config_path) as f:
+                config = json.load(f)
+            self.network = ipaddress.IPv4Network(config["network"], strict=False)
+            routers = config["routers"]
+            if not isinstance(routers, list):
+                raise ValueError('"routers" doit être une liste')
+            for r in routers:
+                if not isinstance(r, dict) or "name" not in r or not isinstance(r.get("subnets"), list):
+                    raise ValueError(f"routeur invalide : {r!r}")
+                for s in r["subnets"]:
+                    if (not isinstance(s, dict) or "name" not in s
+                            or type(s.get("hosts")) is not int or s["hosts"] < 0):
+                        raise ValueError(f"sous-réseau invalide dans {r['name']} : {s!r}")
+            self.routers = routers
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            console.print(f"[red]❌ Fichier de configuration invalide ({self.config_path}) : {e}[/red]")
+            sys.exit(1)
 
     def gather_input(self):
+        self.routers = []
         while True:
             try:
-                net_input = Prompt.ask("Adresse réseau principale (ex: 192.168.0.0/16)")
+                net_input = self._prompt("Adresse réseau principale (ex: 192.168.0.0/16)")
                 self.network = ipaddress.IPv4Network(net_input, strict=False)
                 break
             except ValueError:
                 console.print("[red]Adresse invalide.[/red]")
 
-        nb_routers = IntPrompt.ask("Nombre de routeurs", default=2)
+        nb_routers = _ask_int("Nombre de routeurs", 2)
         for r in range(1, nb_routers + 1):
             console.print(f"\n[bold cyan]Routeur R{r}[/bold cyan]")
-            interfaces = IntPrompt.ask("  Nombre d'interfaces connectées (hors loopback)", default=2)
-            subnets = IntPrompt.ask("  Nombre de sous-réseaux connectés", default=1)
+            interfaces = _ask_int("  Nombre d'interfaces connectées (hors loopback)", 2)
+            subnets = _ask_int("  Nombre de sous-réseaux connectés", 1)
 
             router = {"name": f"R{r}", "interfaces": interfaces, "subnets": []}
             for s in range(1, subnets + 1):
-                hosts = IntPrompt.ask(f"    Sous-réseau {s} - Nombre d'utilisateurs", default=10)
+                hosts = _ask_int(f"    Sous-réseau {s} - Nombre d'utilisateurs", 10)
                 router["subnets"].append({"name": f"LAN{s}", "hosts": hosts})
             self.routers.append(router)
 
     def check_capacity(self):
-        total_needed = 0
-        for r in self.routers:
-            for s in r["subnets"]:
-                needed = s["hosts"] + 2
-                total_needed += 2 ** (32 - max(32 - (needed - 1).bit_length(), 24))
+        total_needed = sum(1 << (32 - _prefix_for(s["hosts"])) for r in self.routers for s in r["subnets"])
         nb_p2p = len(self.routers) * (len(self.routers) - 1) // 2
         total_needed += nb_p2p * 4  # /30 = 4 adresses
         if total_needed > self.network.num_addresses:
@@ -44,61 +192,68 @@ class NetworkPlanner:
             sys.exit(1)
 
     def calculate_vlsm(self):
-        allocations = []
-        remaining = self.network
-        all_subnets = []
+        # Tableaux parallèles (un indice par sous-réseau) plutôt qu'une liste de dicts.
+        # Les descriptions restent des couples de noms jusqu'à la sortie.
+        types, descs, hosts, prefixes = [], [], [], []
 
         # Collecter tous les sous-réseaux (LAN + P2P)
         for r in self.routers:
             for s in r["subnets"]:
-                needed = s["hosts"] + 2
-                prefix = 32 - (needed - 1).bit_length()
-                all_subnets.append({
-                    "type": "LAN",
-                    "desc": f"{r['name']}-{s['name']}",
-                    "hosts": s["hosts"],
-                    "prefix": max(prefix, 24)
-                })
+                types.append("LAN")
+                descs.append((r["name"], s["name"]))
+                hosts.append(s["hosts"])
+                prefixes.append(_prefix_for(s["hosts"]))
 
         # Ajouter les liens point-à-point
-        for i in range(len(self.routers)):
-            for j in range(i + 1, len(self.routers)):
-                all_subnets.append({
-                    "type": "P2P",
-                    "desc": f"{self.routers[i]['name']}->{self.routers[j]['name']}",
-                    "hosts": 2,
-                    "prefix": 30
-                })
-
-        # Trier du plus grand au plus petit (VLSM)
-        all_subnets.sort(key=lambda x: (1_000_000 if x["type"] == "P2P" else -x["hosts"]))
-
-        # Allocation
-        for item in all_subnets:
-            try:
-                subnet = list(remaining.subnets(new_prefix=item["prefix"]))[0]
-            except IndexError:
-                console.print(f"[red]❌ Impossible d'allouer {item['desc']} : plus d'espace.[/red]")
-                continue
-
-            allocations.append({
-                "type": item["type"],
-                "desc": item["desc"],
-                "network": str(subnet),
-                "mask": str(subnet.netmask),
-                "range": f"{subnet.network_address + 1} - {subnet.broadcast_address - 1}",
-                "broadcast": str(subnet.broadcast_address)
-            })
-
-            remaining_parts = list(remaining.address_exclude(subnet))
-            remaining = remaining_parts[0] if remaining_parts else None
-            if remaining is None:
-                console.print("[red]⚠️ Espace réseau épuisé.[/red]")
-                break
+        names = [r["name"] for r in self.routers]
+        for i, ni in enumerate(names):
+            for nj in names[i + 1:]:
+                types.append("P2P")
+                descs.append((ni, nj))
+                hosts.append(2)
+                prefixes.append(30)
+
+        # Trier du plus grand au plus petit (VLSM) : seuls les LAN (collectés en
+        # premier) sont triés, les liens P2P (tous en /30) suivent dans l'ordre.
+        nb_lan = types.count("LAN")
+        order = sorted(range(nb_lan), key=hosts.__getitem__, reverse=True)
+        order += range(nb_lan, len(types))
+
+        # Allocation : curseur entier aligné sur la taille de chaque sous-réseau
+        end = int(self.network.network_address) + self.network.num_addresses
+        starts, base = _allocate(int(self.network.network_address), end, [prefixes[i] for i in order])
+        for idx, start in zip(order, starts):
+            if start < 0:
+                console.print(f"[red]❌ Impossible d'allouer {_desc(types[idx], descs[idx])} : plus d'espace.[/red]")
+        if base >= end:
+            console.print("[red]⚠️ Espace réseau épuisé.[/red]")
+
+        # Construire les résultats uniquement à la fin
+        allocations = [_allocation(types[idx], descs[idx], start, prefixes[idx])
+                       for idx, start in zip(order, starts) if start >= 0]
 
         return allocations
 
     def display_table(self, allocations):
+        if self.plain:
+            print("\t".join(HEADERS))
+            for a in allocations:
+                print("\t".join((a.type, a.desc, a.network, a.mask, a.range, a.broadcast)))
+            return
+
+        # Au-delà de quelques centaines de lignes, la mise en page Rich domine :
+        # on écrit directement un bloc de texte préformaté.
+        if len(allocations) > PLAIN_TABLE_THRESHOLD:
+            rows = [HEADERS] + [(a.type, a.desc, a.network, a.mask, a.range, a.broadcast)
+                                for a in allocations]
+            widths = [max(map(len, column)) for column in zip(*rows)][:-1] + [0]
+            fmt = "  ".join(f"{{:<{w}}}" for w in widths) + "\n"
+            console.file.write("Plan d'adressage IP\n" + "".join(fmt.format(*row) for row in rows))
+            return
+
+        _use_rich()
+        from rich.table import Table
+
         table = Table(title="Plan d'adressage IP")
         table.add_column("Type", style="cyan")
         table.add_column("Description", style="magenta")
@@ -109,39 +264,58 @@ class NetworkPlanner:
 
         for a in allocations:
             table.add_row(
-                a["type"], a["desc"], a["network"],
-                a["mask"], a["range"], a["broadcast"]
+                a.type, a.desc, a.network,
+                a.mask, a.range, a.broadcast
             )
         console.print(table)
 
-    def export_json(self, allocations, filename="plan.json"):
+    def export_json(self, allocations, filename="plan.json", compact=False):
         with open(filename, 'w') as f:
-            json.dump(allocations, f, indent=2)
+            json.dump([asdict(a) for a in allocations], f, indent=None if compact else 2)
         console.print(f"[green]✅ Export JSON réussi : {filename}[/green]")
 
     def export_csv(self, allocations, filename="plan.csv"):
         with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=allocations[0].keys())
-            writer.writeheader()
-            writer.writerows(allocations)
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            writer.writerows((a.type, a.desc, a.network, a.mask, a.range, a.broadcast)
+                             for a in allocations)
         console.print(f"[green]✅ Export CSV réussi : {filename}[/green]")
 
-    def run(self):
-        self.gather_input()
+    def run(self, export=None, compact=False):
+        if self.config_path:
+            self.load_config()
+        else:
+            self.gather_input()
         self.check_capacity()
         allocations = self.calculate_vlsm()
         self.display_table(allocations)
 
-        export_choice = Prompt.ask("\nExporter les résultats ?", choices=["json", "csv", "non"], default="non")
+        if export == "json":
+            self.export_json(allocations, compact=compact)
+            return
+        if export == "csv":
+            self.export_csv(allocations)
+            return
+
+        export_choice = self._prompt("\nExporter les résultats ?", choices=["json", "csv", "non"], default="non")
         if export_choice == "json":
-            self.export_json(allocations)
-        elif Prompt.ask("Exporter en CSV ?", choices=["oui", "non"], default="non") == "oui":
+            self.export_json(allocations, compact=compact)
+        elif self._prompt("Exporter en CSV ?", choices=["oui", "non"], default="non") == "oui":
             self.export_csv(allocations)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calculatrice de sous-réseaux VLSM")
+    parser.add_argument("config", nargs="?", help="fichier JSON décrivant le réseau et les routeurs (pas d'invites)")
+    parser.add_argument("--plain", action="store_true", help="mode texte sans Rich (compatible PyPy)")
+    parser.add_argument("--export", choices=["json", "csv"], help="exporter directement sans le demander")
+    parser.add_argument("--compact", action="store_true", help="JSON exporté sans indentation")
+    args = parser.parse_args()
+    if args.compact and args.export == "csv":
+        parser.error("--compact ne s'applique qu'à l'export JSON")
     try:
-        planner = NetworkPlanner()
-        planner.run()
+        planner = NetworkPlanner(args.config, plain=args.plain)
+        planner.run(export=args.export, compact=args.compact)
     except KeyboardInterrupt:
         console.print("\n[red]Interrompu par l'utilisateur.[/red]")
         sys.exit(0)